@@ -16,6 +16,10 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['GEMINI_API_KEY'] = os.getenv('GEMINI_API_KEY')
     
+    # Coordinate snapping grid, validated once at startup
+    from app.location import parse_coordinate_grid
+    app.config['COORDINATE_GRID'] = parse_coordinate_grid(os.getenv('COORDINATE_GRID', '0.01'), app.logger)
+    
     # Register blueprints
     from app.routes import main
     app.register_blueprint(main)
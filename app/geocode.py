@@ -7,28 +7,47 @@ def get_location_name(latitude, longitude):
     Convert latitude and longitude to location name using reverse geocoding
     Uses OpenStreetMap Nominatim API (free) as primary method
     """
+    return get_location_details(latitude, longitude)['name']
+
+def get_location_details(latitude, longitude):
+    """
+    Reverse geocode coordinates into structured location components
+    Returns a dict with name, city, state, country and the provider used
+    """
     try:
         # Try OpenStreetMap Nominatim first (free)
-        location = get_location_nominatim(latitude, longitude)
-        if location:
-            return location
+        details = get_location_details_nominatim(latitude, longitude)
+        if details:
+            return details
         
         # Fallback to Google Geocoding if available
-        google_location = get_location_google(latitude, longitude)
-        if google_location:
-            return google_location
-        
-        # Final fallback - simple coordinate-based location
-        return f"Location at {latitude:.4f}, {longitude:.4f}"
+        details = get_location_details_google(latitude, longitude)
+        if details:
+            return details
         
     except Exception as e:
-        current_app.logger.error(f"Error in get_location_name: {str(e)}")
-        return f"Location at {latitude:.4f}, {longitude:.4f}"
+        current_app.logger.error(f"Error in get_location_details: {str(e)}")
+    
+    # Final fallback - simple coordinate-based location
+    return {
+        'name': f"Location at {latitude:.4f}, {longitude:.4f}",
+        'city': None,
+        'state': None,
+        'country': None,
+        'provider': None
+    }
 
 def get_location_nominatim(latitude, longitude):
     """
     Use OpenStreetMap Nominatim API for reverse geocoding (free)
     """
+    details = get_location_details_nominatim(latitude, longitude)
+    return details['name'] if details else None
+
+def get_location_details_nominatim(latitude, longitude):
+    """
+    Structured reverse geocoding via OpenStreetMap Nominatim
+    """
     try:
         url = "https://nominatim.openstreetmap.org/reverse"
         params = {
@@ -79,9 +98,17 @@ def get_location_nominatim(latitude, longitude):
                 location_parts.append(country)
             
             if location_parts:
-                return ', '.join(location_parts)
+                name = ', '.join(location_parts)
             else:
-                return data['display_name'].split(',')[0]
+                name = data['display_name'].split(',')[0]
+            
+            return {
+                'name': name,
+                'city': city,
+                'state': state,
+                'country': country,
+                'provider': 'nominatim'
+            }
         
         return None
         
@@ -94,6 +121,13 @@ def get_location_google(latitude, longitude):
     Use Google Geocoding API for reverse geocoding
     Requires GOOGLE_MAPS_API_KEY in environment variables
     """
+    details = get_location_details_google(latitude, longitude)
+    return details['name'] if details else None
+
+def get_location_details_google(latitude, longitude):
+    """
+    Structured reverse geocoding via Google Geocoding API
+    """
     try:
         api_key = os.getenv('GOOGLE_MAPS_API_KEY')
         if not api_key:
@@ -143,9 +177,17 @@ def get_location_google(latitude, longitude):
                 location_parts.append(country)
             
             if location_parts:
-                return ', '.join(location_parts)
+                name = ', '.join(location_parts)
             else:
-                return result.get('formatted_address', '').split(',')[0]
+                name = result.get('formatted_address', '').split(',')[0]
+            
+            return {
+                'name': name,
+                'city': city,
+                'state': state,
+                'country': country,
+                'provider': 'google'
+            }
         
         return None
         
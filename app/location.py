@@ -0,0 +1,239 @@
+from flask import current_app
+from app.geocode import get_location_details
+from app.utils import validate_coordinates
+import re
+import threading
+import unicodedata
+
+DEFAULT_COORDINATE_GRID = 0.01  # degrees, roughly 1km at the equator
+MIN_COORDINATE_GRID = 0.000001  # degrees, roughly 10cm - finer is just jitter
+MAX_COORDINATE_GRID = 90.0
+MAX_CACHED_CELLS = 5000
+
+# Provider spellings that should resolve to the same component
+COMPONENT_ALIASES = {
+    'united states of america': 'united states',
+    'usa': 'united states',
+    'us': 'united states',
+    'uk': 'united kingdom',
+    'great britain': 'united kingdom',
+    'russian federation': 'russia',
+    'republic of korea': 'south korea',
+    'korea republic of': 'south korea',
+    'uae': 'united arab emirates',
+    'czechia': 'czech republic',
+    'new york city': 'new york',
+    'city of new york': 'new york',
+    'nct of delhi': 'national capital territory of delhi',
+}
+
+_cell_cache = {}
+_locations = {}
+_location_refs = {}
+_cache_stats = {'hits': 0, 'misses': 0}
+_cache_lock = threading.Lock()
+
+def parse_coordinate_grid(value, logger=None):
+    """
+    Parse a COORDINATE_GRID setting into a grid size in degrees
+    Too-fine grids are clamped and malformed values fall back to the default
+    """
+    try:
+        grid = float(value)
+    except (ValueError, TypeError):
+        grid = None
+
+    if grid is not None and 0 < grid < MIN_COORDINATE_GRID:
+        if logger:
+            logger.warning(f"COORDINATE_GRID {value!r} is too small, using {MIN_COORDINATE_GRID}")
+        return MIN_COORDINATE_GRID
+
+    if grid is None or not MIN_COORDINATE_GRID <= grid <= MAX_COORDINATE_GRID:
+        if logger:
+            logger.warning(f"Invalid COORDINATE_GRID {value!r}, using {DEFAULT_COORDINATE_GRID}")
+        return DEFAULT_COORDINATE_GRID
+
+    return grid
+
+def get_coordinate_grid():
+    """
+    Grid size in degrees used to snap incoming coordinates
+    The value is validated once by create_app()
+    """
+    try:
+        return current_app.config.get('COORDINATE_GRID', DEFAULT_COORDINATE_GRID)
+    except RuntimeError:
+        return DEFAULT_COORDINATE_GRID
+
+def snap_coordinates(lat, lng, grid=None):
+    """
+    Snap coordinates to the centre of their grid cell
+    Nearby clicks that differ only by jitter land on the same cell
+    """
+    if grid is None:
+        grid = get_coordinate_grid()
+    elif not MIN_COORDINATE_GRID <= grid <= MAX_COORDINATE_GRID:
+        raise ValueError(f"Grid must be between {MIN_COORDINATE_GRID} and {MAX_COORDINATE_GRID} degrees")
+
+    # Decimal places needed to print a multiple of the grid exactly
+    decimals = len(f"{grid:.10f}".rstrip('0').split('.')[1])
+
+    snapped_lat = round(round(float(lat) / grid) * grid, decimals)
+    snapped_lng = round(round(float(lng) / grid) * grid, decimals)
+
+    # Keep the cell on the globe and fold the antimeridian onto one side
+    snapped_lat = min(90.0, max(-90.0, snapped_lat))
+    if snapped_lng >= 180:
+        snapped_lng = -180.0
+
+    return snapped_lat + 0.0, snapped_lng + 0.0
+
+def normalize_component(value):
+    """
+    Normalize a location component for comparison across providers
+    """
+    if not value:
+        return None
+
+    # Strip accents so "São Paulo" and "Sao Paulo" match
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+
+    value = re.sub(r'[^\w\s]', ' ', value.lower())
+    value = ' '.join(value.split())
+
+    # Only exact, known-equivalent spellings are folded; distinct places
+    # such as "City of London" and "Greater London" must keep their own ids
+    value = COMPONENT_ALIASES.get(value, value)
+
+    return value or None
+
+def slugify(value):
+    """
+    Turn a normalized component into an id segment
+    """
+    return value.replace(' ', '-')
+
+def build_location_id(components, snapped_lat, snapped_lng):
+    """
+    Build a stable id from normalized components
+    Falls back to the grid cell when the geocoders know nothing
+    """
+    country = components.get('country')
+    if not country:
+        return f"cell:{snapped_lat},{snapped_lng}"
+
+    parts = [country, components.get('state') or '_', components.get('city') or '_']
+    return '/'.join(slugify(part) for part in parts)
+
+def canonicalize_location(lat, lng):
+    """
+    Resolve raw client coordinates to a canonical location
+    Returns (location, error) where location is a dict with id, name,
+    snapped coordinates, normalized components and known aliases
+    """
+    is_valid, error = validate_coordinates(lat, lng)
+    if not is_valid:
+        return None, error
+
+    snapped_lat, snapped_lng = snap_coordinates(lat, lng)
+    cell = (snapped_lat, snapped_lng)
+
+    with _cache_lock:
+        location_id = _cell_cache.get(cell)
+        if location_id is not None:
+            _cache_stats['hits'] += 1
+            record = _locations[location_id]
+            location = dict(record, aliases=list(record['aliases']))
+            location['coordinates'] = {'lat': snapped_lat, 'lng': snapped_lng}
+            return location, None
+        _cache_stats['misses'] += 1
+
+    # Geocode the cell centre so every click in the cell resolves identically
+    details = get_location_details(snapped_lat, snapped_lng)
+
+    components = {
+        'city': normalize_component(details.get('city')),
+        'state': normalize_component(details.get('state')),
+        'country': normalize_component(details.get('country'))
+    }
+    location_id = build_location_id(components, snapped_lat, snapped_lng)
+
+    # Don't cache the fallback when the geocoders were unavailable
+    if not details.get('provider'):
+        return {
+            'id': location_id,
+            'name': details['name'],
+            'components': components,
+            'aliases': [details['name']],
+            'coordinates': {'lat': snapped_lat, 'lng': snapped_lng}
+        }, None
+
+    with _cache_lock:
+        record = _locations.get(location_id)
+        if record is None:
+            record = {
+                'id': location_id,
+                'name': details['name'],
+                'components': components,
+                'aliases': []
+            }
+            _locations[location_id] = record
+            _location_refs[location_id] = 0
+
+        # Remember every provider spelling seen for this id
+        if details['name'] not in record['aliases']:
+            record['aliases'].append(details['name'])
+
+        # Take the new reference first so releasing never drops this record
+        _location_refs[location_id] += 1
+
+        # Another request may have resolved this cell in the meantime
+        previous_id = _cell_cache.pop(cell, None)
+        if previous_id is not None:
+            release_location(previous_id)
+        elif len(_cell_cache) >= MAX_CACHED_CELLS:
+            # Evict the oldest cell once the cache is full
+            evicted_cell = next(iter(_cell_cache))
+            release_location(_cell_cache.pop(evicted_cell))
+
+        _cell_cache[cell] = location_id
+
+        location = dict(record, aliases=list(record['aliases']))
+
+    location['coordinates'] = {'lat': snapped_lat, 'lng': snapped_lng}
+    return location, None
+
+def release_location(location_id):
+    """
+    Drop one cell reference to a location record
+    The record is removed once no cached cell points at it
+    Caller must hold _cache_lock
+    """
+    _location_refs[location_id] -= 1
+    if _location_refs[location_id] <= 0:
+        del _location_refs[location_id]
+        del _locations[location_id]
+
+def get_location_cache_stats():
+    """
+    Hit/miss counters for the snapped-cell location cache
+    """
+    with _cache_lock:
+        return {
+            'hits': _cache_stats['hits'],
+            'misses': _cache_stats['misses'],
+            'cells': len(_cell_cache),
+            'locations': len(_locations)
+        }
+
+def clear_location_cache():
+    """
+    Reset the location cache and its counters
+    """
+    with _cache_lock:
+        _cell_cache.clear()
+        _locations.clear()
+        _location_refs.clear()
+        _cache_stats['hits'] = 0
+        _cache_stats['misses'] = 0
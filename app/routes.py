@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.search_engine import search_news
-from app.geocode import get_location_name
+from app.location import canonicalize_location
 from app.utils import summarize_news
 import json
 import os
@@ -25,10 +25,13 @@ def get_news():
         lat = data['lat']
         lng = data['lng']
         
-        # Get location name from coordinates
-        location_name = get_location_name(lat, lng)
-        if not location_name:
-            return jsonify({'error': 'Could not determine location'}), 400
+        # Snap coordinates and resolve them to a canonical location
+        location, error = canonicalize_location(lat, lng)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        location_id = location['id']
+        location_name = location['name']
         
         # Search for news
         news_articles = search_news(location_name)
@@ -41,10 +44,11 @@ def get_news():
             return jsonify({'error': 'Failed to generate news summary'}), 500
         
         # Log the request
-        log_request(lat, lng, location_name, summary)
+        log_request(lat, lng, location_name, summary, location_id)
         
         response = {
             'location': location_name,
+            'location_id': location_id,
             'coordinates': {'lat': lat, 'lng': lng},
             'summary': summary,
             'articles_count': len(news_articles),
@@ -57,13 +61,14 @@ def get_news():
         current_app.logger.error(f"Error in get_news: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-def log_request(lat, lng, location, summary):
+def log_request(lat, lng, location, summary, location_id=None):
     """Log requests to chatlog.json"""
     try:
         log_entry = {
             'timestamp': datetime.now().isoformat(),
             'coordinates': {'lat': lat, 'lng': lng},
             'location': location,
+            'location_id': location_id,
             'summary': summary[:200] + '...' if len(summary) > 200 else summary
         }
         
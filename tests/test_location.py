@@ -0,0 +1,217 @@
+import pytest
+from flask import Flask
+
+import app.location as location_module
+from app.location import (
+    DEFAULT_COORDINATE_GRID,
+    MIN_COORDINATE_GRID,
+    build_location_id,
+    canonicalize_location,
+    clear_location_cache,
+    get_location_cache_stats,
+    get_coordinate_grid,
+    normalize_component,
+    parse_coordinate_grid,
+    snap_coordinates,
+)
+
+def test_snap_coordinates_merges_jitter():
+    assert snap_coordinates(40.71284, -74.00597, 0.01) == (40.71, -74.01)
+    assert snap_coordinates(40.71301, -74.00551, 0.01) == (40.71, -74.01)
+
+def test_snap_coordinates_coarse_grid():
+    assert snap_coordinates(12.3, 45.6, 0.25) == (12.25, 45.5)
+    assert snap_coordinates(12.3, 45.6, 1) == (12.0, 46.0)
+
+def test_snap_coordinates_folds_antimeridian():
+    assert snap_coordinates(10, 179.999, 0.01) == (10.0, -180.0)
+    assert snap_coordinates(10, -179.999, 0.01) == (10.0, -180.0)
+
+def test_snap_coordinates_clamps_latitude():
+    assert snap_coordinates(89.9, 0, 7) == (90.0, 0.0)
+    assert snap_coordinates(-89.9, 0, 7) == (-90.0, 0.0)
+
+def test_snap_coordinates_has_no_negative_zero():
+    lat, lng = snap_coordinates(-0.001, -0.001, 0.01)
+    assert str(lat) == '0.0' and str(lng) == '0.0'
+
+@pytest.mark.parametrize('grid', [0, -0.01, MIN_COORDINATE_GRID / 10, 1e-12, 91])
+def test_snap_coordinates_rejects_bad_grid(grid):
+    with pytest.raises(ValueError):
+        snap_coordinates(1, 1, grid)
+
+@pytest.mark.parametrize('configured, expected', [
+    ('0.05', 0.05),
+    ('not-a-number', DEFAULT_COORDINATE_GRID),
+    (None, DEFAULT_COORDINATE_GRID),
+    ('0', DEFAULT_COORDINATE_GRID),
+    ('-1', DEFAULT_COORDINATE_GRID),
+    ('nan', DEFAULT_COORDINATE_GRID),
+    ('1e-12', MIN_COORDINATE_GRID),
+])
+def test_parse_coordinate_grid(configured, expected):
+    assert parse_coordinate_grid(configured) == expected
+
+def test_parse_coordinate_grid_warns_once(caplog):
+    app = Flask(__name__)
+    parse_coordinate_grid('bogus', app.logger)
+    assert len([r for r in caplog.records if 'COORDINATE_GRID' in r.getMessage()]) == 1
+
+def test_get_coordinate_grid_reads_parsed_config():
+    app = Flask(__name__)
+    app.config['COORDINATE_GRID'] = 0.05
+    with app.app_context():
+        assert get_coordinate_grid() == 0.05
+        assert snap_coordinates(1.02, 1.08) == (1.0, 1.1)
+
+def test_get_coordinate_grid_outside_app_context():
+    assert get_coordinate_grid() == DEFAULT_COORDINATE_GRID
+
+def test_normalize_component_folds_equivalent_spellings():
+    assert normalize_component('United States of America') == 'united states'
+    assert normalize_component('USA') == 'united states'
+    assert normalize_component('City of New York') == 'new york'
+    assert normalize_component('São Paulo') == normalize_component('Sao Paulo') == 'sao paulo'
+    assert normalize_component('  Rio   de Janeiro ') == 'rio de janeiro'
+    assert normalize_component('') is None
+    assert normalize_component(None) is None
+
+def test_normalize_component_keeps_distinct_places_apart():
+    assert normalize_component('City of London') != normalize_component('Greater London')
+    assert normalize_component('New Delhi') != normalize_component('Delhi')
+    assert normalize_component('Lake District') == 'lake district'
+    assert normalize_component('Federal District') == 'federal district'
+
+def test_build_location_id():
+    components = {'city': 'new york', 'state': 'new york', 'country': 'united states'}
+    assert build_location_id(components, 40.71, -74.01) == 'united-states/new-york/new-york'
+
+def test_build_location_id_missing_parts():
+    components = {'city': None, 'state': None, 'country': 'antarctica'}
+    assert build_location_id(components, -80.0, 10.0) == 'antarctica/_/_'
+
+def test_build_location_id_falls_back_to_cell():
+    components = {'city': None, 'state': None, 'country': None}
+    assert build_location_id(components, 0.0, -150.5) == 'cell:0.0,-150.5'
+
+def location_ids():
+    return sorted(location_module._locations)
+
+def place(name, city, state='new york', country='united states'):
+    return {'name': name, 'city': city, 'state': state, 'country': country, 'provider': 'nominatim'}
+
+FALLBACK = {'name': 'Location at 0.0000, 0.0000', 'city': None, 'state': None, 'country': None, 'provider': None}
+
+@pytest.fixture
+def geocoder(monkeypatch):
+    """
+    Stub get_location_details with per-cell results and record every call
+    """
+    clear_location_cache()
+    results = {}
+    calls = []
+
+    def fake_details(lat, lng):
+        calls.append((lat, lng))
+        return results[(lat, lng)]
+
+    monkeypatch.setattr('app.location.get_location_details', fake_details)
+    yield results, calls
+    clear_location_cache()
+
+def test_canonicalize_location_hit_and_miss(geocoder):
+    results, calls = geocoder
+    results[(40.71, -74.01)] = place('New York, New York, United States', 'New York')
+
+    first, error = canonicalize_location(40.71284, -74.00597)
+    second, _ = canonicalize_location(40.7131, -74.0055)
+
+    assert error is None
+    assert first['id'] == second['id'] == 'united-states/new-york/new-york'
+    assert second['coordinates'] == {'lat': 40.71, 'lng': -74.01}
+    assert calls == [(40.71, -74.01)]
+    assert get_location_cache_stats() == {'hits': 1, 'misses': 1, 'cells': 1, 'locations': 1}
+
+def test_canonicalize_location_rejects_invalid_coordinates(geocoder):
+    location, error = canonicalize_location(200, 0)
+    assert location is None
+    assert error == 'Latitude must be between -90 and 90'
+    assert get_location_cache_stats()['misses'] == 0
+
+def test_canonicalize_location_collects_aliases(geocoder):
+    results, _ = geocoder
+    results[(40.71, -74.01)] = place('New York, New York, United States', 'New York')
+    results[(40.72, -74.01)] = place('City of New York, NY, USA', 'City of New York', country='USA')
+
+    canonicalize_location(40.71, -74.01)
+    location, _ = canonicalize_location(40.72, -74.01)
+
+    assert location['id'] == 'united-states/new-york/new-york'
+    assert location['name'] == 'New York, New York, United States'
+    assert location['aliases'] == ['New York, New York, United States', 'City of New York, NY, USA']
+    assert get_location_cache_stats()['locations'] == 1
+
+def test_canonicalize_location_never_caches_fallback(geocoder):
+    results, calls = geocoder
+    results[(0.0, 0.0)] = FALLBACK
+
+    first, _ = canonicalize_location(0, 0)
+    second, _ = canonicalize_location(0, 0)
+
+    assert first['id'] == second['id'] == 'cell:0.0,0.0'
+    assert len(calls) == 2
+    assert get_location_cache_stats() == {'hits': 0, 'misses': 2, 'cells': 0, 'locations': 0}
+
+def test_eviction_keeps_record_while_a_cell_points_at_it(geocoder, monkeypatch):
+    results, _ = geocoder
+    monkeypatch.setattr('app.location.MAX_CACHED_CELLS', 3)
+    results[(1.0, 1.0)] = place('A', 'a')
+    results[(2.0, 2.0)] = place('A', 'a')
+    results[(3.0, 3.0)] = place('B', 'b')
+    results[(4.0, 4.0)] = place('C', 'c')
+    results[(5.0, 5.0)] = place('D', 'd')
+
+    for lat in (1, 2, 3):
+        canonicalize_location(lat, lat)
+    assert get_location_cache_stats()['locations'] == 2
+
+    # Evicts cell 1, but cell 2 still points at record A
+    canonicalize_location(4, 4)
+    stats = get_location_cache_stats()
+    assert (stats['cells'], stats['locations']) == (3, 3)
+
+    # Evicts cell 2, the last reference to record A
+    canonicalize_location(5, 5)
+    stats = get_location_cache_stats()
+    assert (stats['cells'], stats['locations']) == (3, 3)
+    assert 'united-states/new-york/a' not in location_ids()
+
+def test_replaced_cell_releases_old_id(geocoder, monkeypatch):
+    results, _ = geocoder
+    results[(1.0, 1.0)] = place('B', 'b')
+
+    def racing_details(lat, lng):
+        # A concurrent request resolves the same cell to B while this one
+        # is still geocoding, then this one finishes with A
+        monkeypatch.setattr('app.location.get_location_details', lambda *args: results[(lat, lng)])
+        other, _ = canonicalize_location(lat, lng)
+        assert other['id'] == 'united-states/new-york/b'
+        return place('A', 'a')
+
+    monkeypatch.setattr('app.location.get_location_details', racing_details)
+    location, _ = canonicalize_location(1, 1)
+
+    assert location['id'] == 'united-states/new-york/a'
+    assert location_ids() == ['united-states/new-york/a']
+    assert location_module._location_refs == {'united-states/new-york/a': 1}
+    assert get_location_cache_stats() == {'hits': 0, 'misses': 2, 'cells': 1, 'locations': 1}
+
+def test_clear_location_cache_resets_counters(geocoder):
+    results, _ = geocoder
+    results[(1.0, 1.0)] = place('A', 'a')
+    canonicalize_location(1, 1)
+    canonicalize_location(1, 1)
+
+    clear_location_cache()
+
+    assert get_location_cache_stats() == {'hits': 0, 'misses': 0, 'cells': 0, 'locations': 0}
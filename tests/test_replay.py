@@ -0,0 +1,255 @@
+import json
+
+import pytest
+import requests
+
+from tools.replay import ResponseStore, StoredText, compress_gaps, load_trace, main, replay, summarize_timings
+
+def test_load_trace_from_chatlog_array(tmp_path):
+    path = tmp_path / 'chatlog.json'
+    path.write_text(json.dumps([
+        {'timestamp': '2025-01-01T12:00:05Z', 'coordinates': {'lat': 2, 'lng': 3}},
+        {'timestamp': '2025-01-01T12:00:00Z', 'coordinates': {'lat': 1, 'lng': 1}},
+        {'note': 'not a request'}
+    ]))
+
+    trace = load_trace(str(path))
+
+    assert trace == [
+        {'lat': 1, 'lng': 1, 'offset': 0.0},
+        {'lat': 2, 'lng': 3, 'offset': 5.0}
+    ]
+
+def test_load_trace_from_jsonl(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    path.write_text(
+        '{"timestamp": "2025-01-01T12:00:00+00:00", "lat": 10, "lng": 20}\n'
+        '\n'
+        '{"timestamp": "2025-01-01T12:00:01.500000+00:00", "lat": 11, "lng": 21}\n'
+        '{"timestamp": "garbage", "lat": 0, "lng": 0}\n'
+    )
+
+    trace = load_trace(str(path))
+
+    assert [item['offset'] for item in trace] == [0.0, 1.5]
+    assert [(item['lat'], item['lng']) for item in trace] == [(10, 20), (11, 21)]
+
+def test_load_trace_skips_malformed_jsonl_lines(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    path.write_text(
+        '{"timestamp": "2025-01-01T12:00:00Z", "lat": 10, "lng": 20}\n'
+        '{"timestamp": "2025-01-01T12:00:01Z", "lat": \n'
+        '["not", "an", "object"]\n'
+        '{"timestamp": "2025-01-01T12:00:02Z", "lat": 11, "lng": 21}\n'
+    )
+
+    trace = load_trace(str(path))
+
+    assert [(item['lat'], item['offset']) for item in trace] == [(10, 0.0), (11, 2.0)]
+
+def test_main_exits_on_empty_trace(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'requests.jsonl'
+    path.write_text('{"request_id": "user-001", "title": "Not a trace"}\n')
+    monkeypatch.setattr('sys.argv', ['replay', str(path), '--store', str(tmp_path / 'store.json')])
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+
+    assert exit_info.value.code == 1
+    assert 'No replayable requests' in capsys.readouterr().err
+
+def test_load_trace_empty(tmp_path):
+    path = tmp_path / 'empty.json'
+    path.write_text('[]')
+    assert load_trace(str(path)) == []
+
+def test_compress_gaps_caps_idle_time():
+    trace = [{'offset': 0.0}, {'offset': 5.0}, {'offset': 1000.0}, {'offset': 1002.0}, {'offset': 5000.0}]
+
+    compress_gaps(trace, 10)
+
+    assert [item['offset'] for item in trace] == [0.0, 5.0, 15.0, 17.0, 27.0]
+
+def test_compress_gaps_leaves_short_gaps_alone():
+    trace = [{'offset': 0.0}, {'offset': 3.0}, {'offset': 4.5}]
+    compress_gaps(trace, 10)
+    assert [item['offset'] for item in trace] == [0.0, 3.0, 4.5]
+
+def test_summarize_timings():
+    samples = [i / 1000 for i in range(1, 101)]  # 1ms .. 100ms
+
+    summary = summarize_timings(samples)
+
+    assert summary['count'] == 100
+    assert summary['mean_ms'] == pytest.approx(50.5)
+    assert summary['p50_ms'] == pytest.approx(51.0)
+    assert summary['p95_ms'] == pytest.approx(95.0)
+    assert summary['p99_ms'] == pytest.approx(99.0)
+    assert summary['max_ms'] == pytest.approx(100.0)
+
+def test_summarize_timings_single_and_empty():
+    assert summarize_timings([]) == {'count': 0}
+    summary = summarize_timings([0.25])
+    assert summary['p50_ms'] == summary['p99_ms'] == summary['max_ms'] == 250.0
+
+def test_http_key_strips_secrets(tmp_path):
+    store = ResponseStore(str(tmp_path / 'store.json'))
+
+    key = store.http_key('https://gnews.io/api/v4/search', {'q': 'Paris', 'token': 'secret-token', 'max': 10})
+    google_key = store.http_key('https://maps.googleapis.com/maps/api/geocode/json', {'latlng': '1,2', 'key': 'secret-key'})
+
+    assert 'secret-token' not in key
+    assert 'secret-key' not in google_key
+    assert key == store.http_key('https://gnews.io/api/v4/search', {'max': 10, 'q': 'Paris', 'token': 'other'})
+
+def test_http_key_is_order_independent(tmp_path):
+    store = ResponseStore(str(tmp_path / 'store.json'))
+    first = store.http_key('https://example.com', {'a': 1, 'b': 2})
+    second = store.http_key('https://example.com', {'b': 2, 'a': 1})
+    assert first == second
+    assert first != store.http_key('https://example.com', {'a': 1, 'b': 3})
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+def test_record_saves_only_successful_responses(tmp_path):
+    path = tmp_path / 'store.json'
+    store = ResponseStore(str(path), record=True)
+    responses = {'ok': FakeResponse(200, {'articles': []}), 'limited': FakeResponse(429, {'errors': ['quota']})}
+    stored_get = store.patched_get(lambda url, params=None, **kwargs: responses[params['q']])
+
+    assert stored_get('https://gnews.io/api/v4/search', params={'q': 'limited'}).status_code == 429
+    assert stored_get('https://gnews.io/api/v4/search', params={'q': 'ok'}).status_code == 200
+    store.flush()
+
+    saved = json.loads(path.read_text())
+    assert list(saved.values()) == [{'status': 200, 'body': {'articles': []}}]
+
+NOMINATIM_NEW_YORK = {
+    'display_name': 'New York, United States',
+    'address': {'city': 'New York', 'state': 'New York', 'country': 'United States'}
+}
+GNEWS_NEW_YORK = {'articles': [{'url': 'https://example.com/ny', 'description': 'Something happened in New York.'}]}
+GEMINI_SUMMARY = 'A recorded summary of the latest New York news that is long enough to be accepted.'
+
+TRACE = [
+    {'offset': 0.0, 'lat': 40.71284, 'lng': -74.00597},
+    {'offset': 0.01, 'lat': 40.7131, 'lng': -74.0055},
+    {'offset': 0.02, 'lat': 200, 'lng': 0}
+]
+
+class FakeModel:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return StoredText(GEMINI_SUMMARY)
+
+def fake_upstream_get(url, params=None, **kwargs):
+    if 'nominatim' in url:
+        return FakeResponse(200, NOMINATIM_NEW_YORK)
+    if 'gnews' in url:
+        return FakeResponse(200, GNEWS_NEW_YORK)
+    raise AssertionError(f"unexpected upstream {url}")
+
+def refuse_upstream(*args, **kwargs):
+    raise AssertionError("replay must not reach the real upstreams")
+
+@pytest.fixture
+def replay_env(tmp_path, monkeypatch):
+    # Run from a scratch directory so nothing touches Data/chatlog.json
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('GOOGLE_MAPS_API_KEY', raising=False)
+    monkeypatch.delenv('COORDINATE_GRID', raising=False)
+    return tmp_path
+
+def test_replay_records_then_serves_from_store(replay_env, monkeypatch):
+    store_path = str(replay_env / 'store.json')
+
+    # Record pass against stubbed upstreams
+    model = FakeModel()
+    monkeypatch.setattr('requests.get', fake_upstream_get)
+    monkeypatch.setattr('app.utils.configure_gemini', lambda: model)
+    replay(TRACE, ResponseStore(store_path, record=True), speed=None, workers=1)
+    assert len(model.prompts) == 1
+
+    # Replay pass: every upstream must now come from the store
+    monkeypatch.setattr('requests.get', refuse_upstream)
+    monkeypatch.setattr('app.utils.configure_gemini', refuse_upstream)
+    store = ResponseStore(store_path)
+    report = replay(TRACE, store, speed=None, workers=1)
+
+    assert report['requests'] == 3
+    assert report['statuses'] == {'200': 2, '400': 1}
+    assert set(report['stages']) == {'location', 'search', 'summarize', 'total', 'end_to_end'}
+    assert report['stages']['location']['count'] == 3
+    assert report['stages']['search']['count'] == 2
+    assert report['location_cache']['hits'] == 1
+    assert report['location_cache']['misses'] == 1
+    assert report['location_cache']['hit_rate'] == 0.5
+    assert report['upstream']['calls'] == {'gemini': 2, 'gnews.io': 2, 'nominatim.openstreetmap.org': 1}
+    assert report['upstream']['store_misses'] == 0
+    assert report['upstream']['store_hit_rate'] == 1.0
+    assert report['schedule_lag']['count'] == 3
+    assert not (replay_env / 'Data').exists()
+
+def test_replay_paced_by_trace_offsets(replay_env, monkeypatch):
+    monkeypatch.setattr('requests.get', refuse_upstream)
+    trace = [{'offset': 0.0, 'lat': 200, 'lng': 0}, {'offset': 0.2, 'lat': 200, 'lng': 0}]
+
+    report = replay(trace, ResponseStore(str(replay_env / 'store.json')), speed=2.0, workers=1)
+
+    assert report['statuses'] == {'400': 2}
+    assert report['elapsed_s'] >= 0.1
+
+def test_replay_rejects_invalid_settings(replay_env):
+    store = ResponseStore(str(replay_env / 'store.json'))
+    with pytest.raises(ValueError):
+        replay(TRACE, store, speed=0)
+    with pytest.raises(ValueError):
+        replay(TRACE, store, workers=0)
+
+def test_patched_get_serves_hits_and_raises_on_miss(tmp_path):
+    store = ResponseStore(str(tmp_path / 'store.json'))
+    params = {'q': 'Paris', 'token': 'secret'}
+    store.responses[store.http_key('https://gnews.io/api/v4/search', params)] = {'status': 200, 'body': {'articles': []}}
+    stored_get = store.patched_get(refuse_upstream)
+
+    response = stored_get('https://gnews.io/api/v4/search', params=params)
+    assert response.status_code == 200
+    assert response.json() == {'articles': []}
+
+    with pytest.raises(requests.ConnectionError):
+        stored_get('https://gnews.io/api/v4/search', params={'q': 'Rome'})
+
+    assert store.calls == {'gnews.io': 2}
+    assert (store.hits, store.misses) == (1, 1)
+
+def test_patched_get_replays_stored_error_status(tmp_path):
+    store = ResponseStore(str(tmp_path / 'store.json'))
+    store.responses[store.http_key('https://example.com', {})] = {'status': 404, 'body': {}}
+
+    response = store.patched_get(refuse_upstream)('https://example.com')
+
+    with pytest.raises(requests.HTTPError):
+        response.raise_for_status()
+
+def test_patched_configure_gemini_serves_hits_and_raises_on_miss(tmp_path):
+    store = ResponseStore(str(tmp_path / 'store.json'))
+    store.responses[store.prompt_key('known prompt')] = GEMINI_SUMMARY
+    model = store.patched_configure_gemini(refuse_upstream)()
+
+    assert model.generate_content('known prompt').text == GEMINI_SUMMARY
+    with pytest.raises(RuntimeError):
+        model.generate_content('unknown prompt')
+    assert store.calls == {'gemini': 2}
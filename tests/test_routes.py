@@ -0,0 +1,60 @@
+import pytest
+
+from app import create_app
+
+NEW_YORK = {
+    'id': 'united-states/new-york/new-york',
+    'name': 'New York, New York, United States',
+    'components': {'city': 'new york', 'state': 'new york', 'country': 'united states'},
+    'aliases': ['New York, New York, United States'],
+    'coordinates': {'lat': 40.71, 'lng': -74.01}
+}
+
+@pytest.fixture
+def client(monkeypatch):
+    logged = []
+    monkeypatch.setattr('app.routes.canonicalize_location', lambda lat, lng: (NEW_YORK, None))
+    monkeypatch.setattr('app.routes.search_news', lambda location_name: [{'url': 'https://example.com', 'content': 'News'}])
+    monkeypatch.setattr('app.routes.summarize_news', lambda articles, location_name: 'Summary')
+    monkeypatch.setattr('app.routes.log_request', lambda *args: logged.append(args))
+
+    app = create_app()
+    app.config['TESTING'] = True
+    client = app.test_client()
+    client.logged = logged
+    return client
+
+def test_get_news_returns_location_id(client):
+    response = client.post('/api/news', json={'lat': 40.71284, 'lng': -74.00597})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['location'] == 'New York, New York, United States'
+    assert body['location_id'] == 'united-states/new-york/new-york'
+    assert body['coordinates'] == {'lat': 40.71284, 'lng': -74.00597}
+
+def test_get_news_logs_location_id(client):
+    client.post('/api/news', json={'lat': 40.71284, 'lng': -74.00597})
+
+    assert client.logged == [(40.71284, -74.00597, 'New York, New York, United States', 'Summary', 'united-states/new-york/new-york')]
+
+@pytest.mark.parametrize('payload, error', [
+    ({'lat': 200, 'lng': 0}, 'Latitude must be between -90 and 90'),
+    ({'lat': 0, 'lng': -181}, 'Longitude must be between -180 and 180'),
+    ({'lat': 'north', 'lng': 0}, 'Invalid coordinate format'),
+])
+def test_get_news_rejects_invalid_coordinates(client, monkeypatch, payload, error):
+    # Use the real canonicalizer so validate_coordinates runs; it returns
+    # before any geocoding for invalid input
+    from app.location import canonicalize_location
+    monkeypatch.setattr('app.routes.canonicalize_location', canonicalize_location)
+
+    response = client.post('/api/news', json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+    assert client.logged == []
+
+def test_get_news_requires_coordinates(client):
+    response = client.post('/api/news', json={'lat': 1})
+    assert response.status_code == 400
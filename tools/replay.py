@@ -0,0 +1,388 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+from urllib.parse import urlparse
+
+import requests
+
+# Query parameters that carry credentials and must not end up in the store
+SECRET_PARAMS = ('key', 'token')
+
+def parse_timestamp(value):
+    """
+    Parse an ISO timestamp from a trace entry into epoch seconds
+    """
+    value = value.replace('Z', '+00:00')
+    return datetime.fromisoformat(value).timestamp()
+
+def load_trace(path):
+    """
+    Load recorded requests from a chatlog.json array or a .jsonl file
+    Returns a list of {'offset', 'lat', 'lng'} sorted by time
+    """
+    with open(path, 'r') as f:
+        if path.endswith('.jsonl'):
+            # Lines are parsed below so one malformed line is skipped, not fatal
+            entries = [line for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+
+    trace = []
+    for entry in entries:
+        try:
+            if isinstance(entry, str):
+                entry = json.loads(entry)
+            coordinates = entry.get('coordinates', entry)
+            trace.append({
+                'time': parse_timestamp(entry['timestamp']),
+                'lat': coordinates['lat'],
+                'lng': coordinates['lng']
+            })
+        except (KeyError, TypeError, ValueError, AttributeError):
+            # Not a request record (e.g. a free-form note) - skip it
+            continue
+
+    trace.sort(key=lambda item: item['time'])
+    if trace:
+        start = trace[0]['time']
+        for item in trace:
+            item['offset'] = item.pop('time') - start
+
+    return trace
+
+def compress_gaps(trace, max_gap):
+    """
+    Cap idle time between consecutive requests to max_gap seconds
+    """
+    shift = 0.0
+    previous = 0.0
+    for item in trace:
+        gap = item['offset'] - previous
+        previous = item['offset']
+        if gap > max_gap:
+            shift += gap - max_gap
+        item['offset'] -= shift
+    return trace
+
+class StoredResponse:
+    """
+    Minimal stand-in for requests.Response built from the store
+    """
+    def __init__(self, url, status_code, body):
+        self.url = url
+        self.status_code = status_code
+        self._body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+class StoredText:
+    """
+    Minimal stand-in for a Gemini response
+    """
+    def __init__(self, text):
+        self.text = text
+
+class ResponseStore:
+    """
+    Recorded upstream responses keyed by request
+    In record mode, misses are fetched from the real upstream and saved
+    """
+    def __init__(self, path, record=False):
+        self.path = path
+        self.record = record
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.responses = json.load(f)
+        else:
+            self.responses = {}
+
+    def http_key(self, url, params):
+        params = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+        return f"GET {url}?{json.dumps(params, sort_keys=True, default=str)}"
+
+    def prompt_key(self, prompt):
+        return f"gemini:{hashlib.sha1(prompt.encode('utf-8')).hexdigest()}"
+
+    def lookup(self, key, upstream):
+        with self.lock:
+            self.calls[upstream] = self.calls.get(upstream, 0) + 1
+            if key in self.responses:
+                self.hits += 1
+                return True, self.responses[key]
+            self.misses += 1
+            return False, None
+
+    def save(self, key, value):
+        with self.lock:
+            self.responses[key] = value
+
+    def flush(self):
+        if not self.record:
+            return
+        with self.lock:
+            with open(self.path, 'w') as f:
+                json.dump(self.responses, f, indent=2)
+
+    def patched_get(self, real_get):
+        """
+        Build a replacement for requests.get served from the store
+        """
+        def stored_get(url, params=None, **kwargs):
+            key = self.http_key(url, params)
+            found, value = self.lookup(key, urlparse(url).netloc)
+            if found:
+                return StoredResponse(url, value['status'], value['body'])
+
+            if not self.record:
+                raise requests.ConnectionError(f"No recorded response for {key}")
+
+            response = real_get(url, params=params, **kwargs)
+
+            # Rate limits, quota errors and outages are not traffic worth replaying
+            if not 200 <= response.status_code < 300:
+                return response
+
+            try:
+                body = response.json()
+            except ValueError:
+                return response
+            self.save(key, {'status': response.status_code, 'body': body})
+            return response
+
+        return stored_get
+
+    def patched_configure_gemini(self, real_configure):
+        """
+        Build a replacement for configure_gemini served from the store
+        """
+        store = self
+
+        class StoredModel:
+            real_model = None
+
+            def generate_content(self, prompt):
+                key = store.prompt_key(prompt)
+                found, value = store.lookup(key, 'gemini')
+                if found:
+                    return StoredText(value)
+
+                if not store.record:
+                    raise RuntimeError(f"No recorded response for {key}")
+
+                if StoredModel.real_model is None:
+                    StoredModel.real_model = real_configure()
+                if StoredModel.real_model is None:
+                    raise RuntimeError("Gemini is not configured")
+
+                response = StoredModel.real_model.generate_content(prompt)
+                if response and response.text:
+                    store.save(key, response.text)
+                return response
+
+        return lambda: StoredModel()
+
+class ReplayStats:
+    """
+    Thread-safe collection of per-stage latencies and response statuses
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.statuses = {}
+        self.lag = []
+
+    def add_timing(self, stage, seconds):
+        with self.lock:
+            self.stages.setdefault(stage, []).append(seconds)
+
+    def add_status(self, status):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def add_lag(self, seconds):
+        with self.lock:
+            self.lag.append(seconds)
+
+    def timed(self, stage, func):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add_timing(stage, time.perf_counter() - started)
+        return wrapper
+
+def summarize_timings(samples):
+    """
+    Count, mean and percentiles (in milliseconds) for a list of durations
+    """
+    if not samples:
+        return {'count': 0}
+
+    ordered = sorted(samples)
+
+    def percentile(p):
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
+
+def replay(trace, store, speed=1.0, workers=8):
+    """
+    Replay a trace against create_app() with upstreams served from the store
+    speed scales the original inter-request timing; None replays at max throughput
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed must be positive")
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    from app import create_app
+    from app import routes, utils
+    from app.location import clear_location_cache, get_location_cache_stats
+
+    app = create_app()
+    stats = ReplayStats()
+    clear_location_cache()
+
+    def send(item, due):
+        client = app.test_client()
+        started = time.perf_counter()
+        # Lateness is measured when the request really starts, so time spent
+        # waiting for a free worker counts against the schedule
+        stats.add_lag(max(0.0, started - due))
+        response = client.post('/api/news', json={'lat': item['lat'], 'lng': item['lng']})
+        finished = time.perf_counter()
+        stats.add_timing('total', finished - started)
+        stats.add_timing('end_to_end', finished - due)
+        stats.add_status(response.status_code)
+
+    # Recorded responses are deterministic, so a single summarizer attempt
+    # avoids the randomized retry sleeps skewing latency
+    summarize_once = lambda articles, location_name: utils.summarize_news(articles, location_name, max_retries=1)
+
+    patches = [
+        mock.patch('requests.get', store.patched_get(requests.get)),
+        mock.patch('app.utils.configure_gemini', store.patched_configure_gemini(utils.configure_gemini)),
+        mock.patch('app.routes.canonicalize_location', stats.timed('location', routes.canonicalize_location)),
+        mock.patch('app.routes.search_news', stats.timed('search', routes.search_news)),
+        mock.patch('app.routes.summarize_news', stats.timed('summarize', summarize_once)),
+        # Keep replayed traffic out of Data/chatlog.json
+        mock.patch('app.routes.log_request', lambda *args, **kwargs: None)
+    ]
+
+    for patch in patches:
+        patch.start()
+
+    try:
+        replay_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for item in trace:
+                if speed is not None:
+                    due = replay_started + item['offset'] / speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                else:
+                    # At max throughput a request is due as soon as it is queued
+                    due = time.perf_counter()
+                futures.append(executor.submit(send, item, due))
+
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - replay_started
+    finally:
+        for patch in reversed(patches):
+            patch.stop()
+        store.flush()
+
+    location_cache = get_location_cache_stats()
+    lookups = location_cache['hits'] + location_cache['misses']
+    upstream_lookups = store.hits + store.misses
+
+    return {
+        'requests': len(trace),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(trace) / elapsed, 2) if elapsed > 0 else None,
+        'statuses': {str(k): v for k, v in sorted(stats.statuses.items())},
+        'stages': {stage: summarize_timings(samples) for stage, samples in stats.stages.items()},
+        'location_cache': dict(location_cache, hit_rate=round(location_cache['hits'] / lookups, 3) if lookups else None),
+        'upstream': {
+            'calls': dict(sorted(store.calls.items())),
+            'store_hits': store.hits,
+            'store_misses': store.misses,
+            'store_hit_rate': round(store.hits / upstream_lookups, 3) if upstream_lookups else None
+        },
+        'schedule_lag': summarize_timings(stats.lag)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded /api/news traffic against the app with recorded upstream responses"
+    )
+    parser.add_argument('trace', nargs='?', default=os.path.join('Data', 'chatlog.json'),
+                        help="chatlog.json array or .jsonl file of {timestamp, coordinates} records")
+    parser.add_argument('--store', default=os.path.join('Data', 'replay_responses.json'),
+                        help="recorded upstream response store")
+    parser.add_argument('--record', action='store_true',
+                        help="fetch store misses from the real upstreams and save them")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="timing scale factor (1 = original speed, 10 = ten times faster)")
+    parser.add_argument('--max', action='store_true',
+                        help="ignore timestamps and replay at max throughput")
+    parser.add_argument('--max-gap', type=float, default=None,
+                        help="cap idle gaps between requests to this many seconds")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="concurrent in-flight requests")
+    parser.add_argument('--output', default=None,
+                        help="also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.speed <= 0:
+        parser.error("--speed must be positive; use --max for max throughput")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_gap is not None and args.max_gap < 0:
+        parser.error("--max-gap must not be negative")
+
+    trace = load_trace(args.trace)
+    if not trace:
+        parser.exit(1, f"No replayable requests (timestamp plus lat/lng) found in {args.trace}\n")
+    if args.max_gap is not None:
+        compress_gaps(trace, args.max_gap)
+
+    store = ResponseStore(args.store, record=args.record)
+    report = replay(trace, store, speed=None if args.max else args.speed, workers=args.workers)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()